@@ -0,0 +1,59 @@
+# Copyright (c) 2026 Shareef Jalloq. MIT License — see LICENSE for details.
+
+"""Durable marker-file writes for the call-once guard."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+# Platforms without O_DSYNC (Windows) fall back to an explicit fsync.
+_O_DSYNC = getattr(os, "O_DSYNC", 0)
+
+
+def fsync_directory(dir_path: Path) -> None:
+    """fsync a directory fd to flush metadata (new/renamed entries) to disk."""
+    fd = os.open(str(dir_path), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_marker(
+    path: Path,
+    content: str = "",
+    *,
+    dir_fd: int | None = None,
+) -> None:
+    """Write *content* to *path* and flush it to stable storage.
+
+    The file is opened with ``O_DSYNC`` so the write itself only returns once
+    the data is durable, saving the separate ``fsync`` round-trip.  When the
+    file is newly created, the parent directory is fsynced as well so the new
+    entry is visible to other clients.
+
+    Callers writing several markers into one directory can pass an open
+    *dir_fd* for ``path.parent``; the file is then created relative to it and
+    the directory fsync reuses it rather than reopening the parent.
+    """
+    name = str(path) if dir_fd is None else path.name
+    flags = os.O_WRONLY | os.O_CREAT | _O_DSYNC
+    try:
+        fd = os.open(name, flags | os.O_EXCL, 0o644, dir_fd=dir_fd)
+        created = True
+    except FileExistsError:
+        fd = os.open(name, flags | os.O_TRUNC, 0o644, dir_fd=dir_fd)
+        created = False
+    try:
+        if content:
+            os.write(fd, content.encode())
+        if not _O_DSYNC:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+    if created:
+        if dir_fd is None:
+            fsync_directory(path.parent)
+        else:
+            os.fsync(dir_fd)
@@ -11,38 +11,21 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
+from pytest_cocotb._marker_io import write_marker
 from pytest_cocotb.nfs_lock import NFSLock
 
 log = logging.getLogger(__name__)
 
 
-def _fsync_directory(dir_path: Path) -> None:
-    """fsync a directory fd to flush metadata (new/renamed entries) to disk."""
-    fd = os.open(str(dir_path), os.O_RDONLY)
-    try:
-        os.fsync(fd)
-    finally:
-        os.close(fd)
-
-
-def _create_marker(path: Path, content: str = "") -> None:
-    """Create a marker file with fsync on both the file and its parent dir."""
-    fd = os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
-    try:
-        if content:
-            os.write(fd, content.encode())
-        os.fsync(fd)
-    finally:
-        os.close(fd)
-    _fsync_directory(path.parent)
-
-
 def _nfs_file_exists(path: Path) -> bool:
     """Check file existence in an NFS-cache-safe way.
 
+    Used by ``CallOnce``'s unlocked ``.done`` probe, where a stale cached
+    positive would skip a re-run requested by ``clean()`` elsewhere.
+
     Opening the parent directory forces the NFS client to revalidate its
-    dentry cache.  Then we attempt ``os.open(O_RDONLY)`` on the file itself
-    instead of relying on ``stat()`` which may return cached results.
+    dentry cache, so the following ``stat()`` sees fresh results.  ``stat()``
+    is a stateless LOOKUP/GETATTR on the server, cheaper than an ``OPEN``.
     """
     parent = path.parent
     try:
@@ -52,18 +35,31 @@ def _nfs_file_exists(path: Path) -> bool:
         return False
 
     try:
-        fd = os.open(str(path), os.O_RDONLY)
-        os.close(fd)
+        os.stat(path)
     except OSError:
         return False
     return True
 
 
+def _nfs_dir_listing(dir_path: Path | int) -> set[str]:
+    """Return the names present in *dir_path* in an NFS-cache-safe way.
+
+    Reading the directory opens it, which forces the NFS client to revalidate
+    its cached entries, and the ``READDIR`` result answers the existence of
+    every child at once.  *dir_path* may also be an open directory fd.  A
+    missing directory yields an empty set.
+    """
+    try:
+        return set(os.listdir(dir_path))
+    except OSError:
+        return set()
+
+
 @dataclass
 class CallOnce:
     """Ensures a callable is executed exactly once across processes.
 
-    Uses an NFS-safe ``mkdir``-based lock and completion/failure markers so
+    Uses an NFS-safe ``rename``-based lock and completion/failure markers so
     that exactly one caller executes the callable while others wait and then
     reuse the result.
 
@@ -100,31 +96,57 @@ class CallOnce:
 
     def ensure_done(self) -> None:
         """Execute the callable if it hasn't been run yet."""
-        self.path.mkdir(parents=True, exist_ok=True)
-        self._lock_dir.mkdir(parents=True, exist_ok=True)
-
-        with NFSLock(self._lock_path, timeout=self.timeout):
-            if _nfs_file_exists(self._done_file):
-                log.info("CallOnce %r already complete", self.name)
-                return
-
-            if _nfs_file_exists(self._fail_file):
-                try:
-                    error_msg = self._fail_file.read_text()
-                except OSError:
-                    error_msg = "<unreadable>"
-                raise RuntimeError(
-                    f"Previous execution of {self.name!r} failed: {error_msg}"
-                )
-
-            log.info("Executing CallOnce %r in %s", self.name, self.path)
+        # Unlocked fast path: .done is only ever written after fn() succeeded
+        # under the lock, so seeing it is authoritative.  The probe bypasses
+        # the NFS attribute cache so a clean() on another host is not masked
+        # by a stale positive; a miss falls through to the locked check.
+        if _nfs_file_exists(self._done_file):
+            log.info("CallOnce %r already complete", self.name)
+            return
+
+        # Try the lock straight away; the parent directories normally exist
+        # already, so only create them when acquire() says otherwise.
+        lock = NFSLock(self._lock_path, timeout=self.timeout)
+        try:
+            lock.acquire()
+        except FileNotFoundError:
+            self._lock_dir.mkdir(parents=True, exist_ok=True)
+            lock.acquire()
+
+        try:
+            # One fd on the lock directory serves the marker probe, the marker
+            # create and the directory fsync, instead of reopening it for each.
+            dir_fd = os.open(self._lock_dir, os.O_RDONLY)
+            try:
+                self._run_locked(dir_fd)
+            finally:
+                os.close(dir_fd)
+        finally:
+            lock.release()
+
+    def _run_locked(self, dir_fd: int) -> None:
+        present = _nfs_dir_listing(dir_fd)
+        if self._done_file.name in present:
+            log.info("CallOnce %r already complete", self.name)
+            return
+
+        if self._fail_file.name in present:
             try:
-                self.fn()
-                _create_marker(self._done_file)
-                log.info("CallOnce %r complete", self.name)
-            except Exception as e:
-                _create_marker(self._fail_file, str(e))
-                raise
+                error_msg = self._fail_file.read_text()
+            except OSError:
+                error_msg = "<unreadable>"
+            raise RuntimeError(
+                f"Previous execution of {self.name!r} failed: {error_msg}"
+            )
+
+        log.info("Executing CallOnce %r in %s", self.name, self.path)
+        try:
+            self.fn()
+            write_marker(self._done_file, dir_fd=dir_fd)
+            log.info("CallOnce %r complete", self.name)
+        except Exception as e:
+            write_marker(self._fail_file, str(e), dir_fd=dir_fd)
+            raise
 
     def clean(self) -> None:
         """Remove marker files to allow re-execution."""
@@ -16,7 +16,20 @@ from hpc_runner import Job, JobStatus
 
 logger = logging.getLogger(__name__)
 
-_VALID_ENV_KEY = re.compile(r"^[a-zA-Z_][a-zA-Z0-9_]*$")
+# The characters shlex.quote() leaves unquoted.
+_SAFE_ARG = re.compile(r"[\w@%+=:,./-]+", re.ASCII)
+
+
+def _valid_env_key(k: str) -> bool:
+    """Return True if *k* is a shell-safe variable name (``[A-Za-z_][A-Za-z0-9_]*``)."""
+    return k.isascii() and k.isidentifier()
+
+
+def _join_command(cmd: Sequence[str]) -> str:
+    """Join *cmd* into a shell command line, quoting only when needed."""
+    if all(_SAFE_ARG.fullmatch(c) for c in cmd):
+        return " ".join(cmd)
+    return shlex.join(cmd)
 
 
 def _cocotb_env_diff(env: dict[str, str]) -> tuple[dict[str, str], dict[str, str]]:
@@ -25,19 +38,29 @@ def _cocotb_env_diff(env: dict[str, str]) -> tuple[dict[str, str], dict[str, str
     Returns:
         (env_vars, env_append) — full replacements and path-style appends.
     """
+    # Bind hot globals/attributes to locals for the loop below.
+    valid = _valid_env_key
+    pathsep = os.pathsep
     base = os.environ
+    get = base.get
     env_vars: dict[str, str] = {}
     env_append: dict[str, str] = {}
 
-    for k, v in env.items():
-        if not _VALID_ENV_KEY.match(k):
+    # cocotb starts from a copy of os.environ, so only a handful of keys
+    # differ; find them with C-level key-set operations before the loop.
+    changed = (env.keys() - base.keys()) | {
+        k for k in env.keys() & base.keys() if env[k] != base[k]
+    }
+
+    # Sort so the job's env dicts (and the debug log) have a stable order.
+    for k in sorted(changed):
+        if not valid(k):
             continue
-        old = base.get(k)
-        if old == v:
-            continue  # unchanged
-        if old is not None and v.startswith(old + os.pathsep):
+        v = env[k]
+        old = get(k)
+        if old is not None and v.startswith(old + pathsep):
             # cocotb appended to this var — extract only the new segment
-            env_append[k] = v[len(old) + len(os.pathsep) :]
+            env_append[k] = v[len(old) + len(pathsep) :]
         else:
             env_vars[k] = v
 
@@ -86,22 +109,21 @@ class HpcExecutorMixin:
         log_file = getattr(self, "log_file", None)
         job_stdout = str(Path(log_file).resolve()) if log_file else None
 
-        for cmd in cmds:
-            command_str = " ".join(shlex.quote(c) for c in cmd)
+        # Every command in one call shares the same environment and modules,
+        # so work these out once rather than per command.
+        env_vars, env_append = _cocotb_env_diff(self.env)  # type: ignore[attr-defined]
 
-            env_vars, env_append = _cocotb_env_diff(self.env)  # type: ignore[attr-defined]
+        # Only pass non-empty kwargs so hpc-runner's config defaults
+        # (tool-detected modules, config env_vars, etc.) are preserved.
+        base_kwargs: dict[str, Any] = dict(name=self.job_name, workdir=str(cwd))
+        if self.modules:
+            base_kwargs["modules"] = list(self.modules)
+        if job_stdout:
+            base_kwargs["stdout"] = job_stdout
 
-            # Only pass non-empty kwargs so hpc-runner's config defaults
-            # (tool-detected modules, config env_vars, etc.) are preserved.
-            job_kwargs: dict[str, Any] = dict(
-                command=command_str,
-                name=self.job_name,
-                workdir=str(cwd),
-            )
-            if self.modules:
-                job_kwargs["modules"] = list(self.modules)
-            if job_stdout:
-                job_kwargs["stdout"] = job_stdout
+        for cmd in cmds:
+            command_str = _join_command(cmd)
+            job_kwargs = {**base_kwargs, "command": command_str}
 
             logger.debug("Creating Job with kwargs: %s", job_kwargs)
 
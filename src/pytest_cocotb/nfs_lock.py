@@ -1,32 +1,162 @@
 # Copyright (c) 2026 Shareef Jalloq. MIT License — see LICENSE for details.
 
-"""NFS-safe locking using mkdir atomicity.
+"""NFS-safe locking using directory rename atomicity.
 
-``os.mkdir()`` is atomic on all NFS versions — it either succeeds or raises
-``FileExistsError``.  This avoids the unreliable ``fcntl.flock()`` behaviour
-that many NFS configurations exhibit (flock may be local-only).
+``os.rename()`` of a directory onto a non-empty directory is atomic on all NFS
+versions — it either succeeds or fails with ``EEXIST``/``ENOTEMPTY``.  This
+avoids the unreliable ``fcntl.flock()`` behaviour that many NFS configurations
+exhibit (flock may be local-only).
 """
 
 from __future__ import annotations
 
 import contextlib
-import json
+import errno
 import logging
 import os
+import random
 import socket
+import threading
 import time
+import uuid
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
 log = logging.getLogger(__name__)
 
+# Constant for the life of the process; looked up on every acquire and on
+# every staleness probe while waiting.
+_HOSTNAME = socket.gethostname()
+_PID = os.getpid()
+# Leading "hostname\npid\n" lines of holder.info; only the timestamp varies.
+_HOLDER_PREFIX = f"{_HOSTNAME}\n{_PID}\n".encode()
+
+_HOLDER_FILE = "holder.info"
+_HOLDER_TMP = "holder.info.tmp"
+
+
+# Per-lock-path conditions signalled when a lock is released in this process,
+# so local waiters retry at once instead of sleeping out their backoff.
+# Waiters in other processes or on other hosts still poll.  Entries live only
+# while some waiter holds a reference.
+_RELEASE_CONDS: weakref.WeakValueDictionary[str, threading.Condition] = (
+    weakref.WeakValueDictionary()
+)
+_RELEASE_CONDS_LOCK = threading.Lock()
+
+# Single background worker that deletes released lock directories after they
+# have been renamed out of the way; created on first use.
+_CLEANUP: ThreadPoolExecutor | None = None
+_CLEANUP_LOCK = threading.Lock()
+
+# Outcomes (True = acquired) of the most recent rename attempts per lock path,
+# used to scale the backoff to how contended that path has been lately.  Kept
+# here rather than on the instance because callers such as CallOnce build a
+# fresh NFSLock for every acquisition.
+_CONTENTION_WINDOW = 16
+_ATTEMPTS: dict[str, deque[bool]] = {}
+_ATTEMPTS_LOCK = threading.Lock()
+
+# Tags of the ".<lock>.<tag>.<pid>.<uuid>" siblings used to stage and tear
+# down a lock, and the lock paths this process has already swept for ones
+# left behind by processes that died.
+_SCRATCH_TAGS = frozenset({"new", "old", "stale"})
+_SWEPT: set[str] = set()
+
+
+def _reset_after_fork() -> None:
+    global _PID, _HOLDER_PREFIX, _RELEASE_CONDS, _RELEASE_CONDS_LOCK
+    global _CLEANUP, _CLEANUP_LOCK, _ATTEMPTS_LOCK
+    _PID = os.getpid()
+    _HOLDER_PREFIX = f"{_HOSTNAME}\n{_PID}\n".encode()
+    # The parent's waiter and cleanup threads don't exist here, and their
+    # locks may have been held mid-fork.
+    _RELEASE_CONDS = weakref.WeakValueDictionary()
+    _RELEASE_CONDS_LOCK = threading.Lock()
+    _CLEANUP = None
+    _CLEANUP_LOCK = threading.Lock()
+    _ATTEMPTS_LOCK = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _release_condition(path: str) -> threading.Condition:
+    with _RELEASE_CONDS_LOCK:
+        cond = _RELEASE_CONDS.get(path)
+        if cond is None:
+            cond = _RELEASE_CONDS[path] = threading.Condition()
+        return cond
+
+
+def _attempt_history(path: str) -> deque[bool]:
+    with _ATTEMPTS_LOCK:
+        attempts = _ATTEMPTS.get(path)
+        if attempts is None:
+            attempts = _ATTEMPTS[path] = deque(maxlen=_CONTENTION_WINDOW)
+        return attempts
+
+
+def _notify_release(path: str) -> None:
+    cond = _RELEASE_CONDS.get(path)
+    if cond is not None:
+        with cond:
+            cond.notify()  # only one waiter can win the lock anyway
+
+
+def _wait_for_release(cond: threading.Condition, timeout: float) -> None:
+    with cond:
+        cond.wait(timeout)
+
+
+# Probing a peer's holder.info shouldn't dirty its inode with an atime update.
+_O_NOATIME = getattr(os, "O_NOATIME", 0)
+
+
+def _read_small_file(path: str) -> bytes:
+    """Read up to 4 KiB of *path* as bytes with a single ``read``."""
+    try:
+        fd = os.open(path, os.O_RDONLY | _O_NOATIME)
+    except PermissionError:
+        if not _O_NOATIME:
+            raise
+        # O_NOATIME is only allowed on files we own.
+        fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.read(fd, 4096)
+    finally:
+        os.close(fd)
+
+
+def _cleanup_executor() -> ThreadPoolExecutor:
+    global _CLEANUP
+    with _CLEANUP_LOCK:
+        if _CLEANUP is None:
+            _CLEANUP = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="nfs-lock-cleanup"
+            )
+        return _CLEANUP
+
+
+def _remove_lock_dir(path: Path) -> None:
+    """Delete a lock directory that is no longer at ``lock_path``."""
+    for name in (_HOLDER_FILE, _HOLDER_TMP):
+        with contextlib.suppress(OSError):
+            (path / name).unlink(missing_ok=True)
+    with contextlib.suppress(OSError):
+        os.rmdir(path)
+
 
 class NFSLockTimeout(TimeoutError):
     """Raised when the lock cannot be acquired within the timeout."""
 
 
 class NFSLock:
-    """A cross-node lock backed by ``mkdir``/``rmdir``.
+    """A cross-node lock backed by directory ``rename``.
 
     Parameters
     ----------
@@ -36,10 +166,18 @@ class NFSLock:
     timeout:
         Maximum seconds to wait for the lock.  ``-1`` means wait forever.
     poll_interval:
-        Seconds between acquisition attempts.
+        Initial seconds between acquisition attempts.  The interval doubles
+        on each failed attempt (with random jitter) up to
+        *max_poll_interval*.
     stale_timeout:
         Seconds after which a lock held by an unreachable host is considered
         stale and may be broken.
+    max_poll_interval:
+        Upper bound on the backed-off interval between attempts.
+    heartbeat:
+        If true, a background thread re-stamps ``holder.info`` every
+        ``stale_timeout / 3`` seconds while the lock is held, so a short
+        *stale_timeout* cannot expire a live holder.
     """
 
     def __init__(
@@ -48,15 +186,18 @@ class NFSLock:
         timeout: float = 3600.0,
         poll_interval: float = 0.1,
         stale_timeout: float = 7200.0,
+        max_poll_interval: float = 0.5,
+        heartbeat: bool = False,
     ) -> None:
         self.lock_path = Path(lock_path)
         self.timeout = timeout
         self.poll_interval = poll_interval
         self.stale_timeout = stale_timeout
-
-    @property
-    def _holder_file(self) -> Path:
-        return self.lock_path / "holder.info"
+        self.max_poll_interval = max_poll_interval
+        self.heartbeat = heartbeat
+        self._heartbeat_stop = threading.Event()
+        self._heartbeat_thread: threading.Thread | None = None
+        self._attempts = _attempt_history(os.fspath(self.lock_path))
 
     # ------------------------------------------------------------------
     # Context-manager interface
@@ -74,62 +215,188 @@ class NFSLock:
     # ------------------------------------------------------------------
 
     def acquire(self) -> None:
-        """Block until the lock directory is created (= lock acquired)."""
-        deadline = None if self.timeout < 0 else time.monotonic() + self.timeout
+        """Block until the lock directory is in place (= lock acquired).
 
-        while True:
+        The lock directory is assembled, ``holder.info`` included, under a
+        private staging name and then renamed onto ``lock_path``, so peers
+        never see a held lock without its holder info.
+
+        Raises ``FileNotFoundError`` if the parent of ``lock_path`` does not
+        exist, so callers can create it lazily and retry.
+        """
+        staging = self._scratch_path("new")
+        os.mkdir(staging)
+        try:
+            self._write_holder_info(staging)
+            waited = self._rename_into_place(staging)
+        except BaseException:
+            _remove_lock_dir(staging)
+            raise
+
+        if waited:
+            # holder.info was stamped before we started waiting; refresh it so
+            # remote peers don't age the lock from the wrong start time.
             try:
-                os.mkdir(self.lock_path)
-            except FileExistsError:
+                self._refresh_holder_info()
+            except BaseException:
+                self.release()  # the lock is ours; don't leak it
+                raise
+        if self.heartbeat:
+            self._start_heartbeat()
+        key = os.fspath(self.lock_path)
+        if key not in _SWEPT:
+            _SWEPT.add(key)
+            _cleanup_executor().submit(self._sweep_litter)
+        log.debug("Acquired lock %s", self.lock_path)
+
+    def _rename_into_place(self, staging: Path) -> bool:
+        """Retry renaming *staging* onto ``lock_path``; return True if we waited."""
+        deadline = None if self.timeout < 0 else time.monotonic() + self.timeout
+        max_delay = max(self.max_poll_interval, self.poll_interval)
+        # The floor comes from earlier acquires only, so this call's own
+        # failures can't cut its exponential ramp short.  Uncontended, the
+        # first retry is immediate (the holder may just have left); after
+        # recent contention start further along the backoff.
+        floor = self._contention_delay(max_delay)
+        delay = floor
+        failures = 0
+        # Convert the paths once rather than on every attempt.
+        src, dst = os.fspath(staging), os.fspath(self.lock_path)
+        released = _release_condition(dst)
+
+        try:
+            while True:
+                try:
+                    # Atomic, and fails while lock_path is a non-empty
+                    # directory, i.e. while someone holds the lock.
+                    os.rename(src, dst)
+                except OSError as e:
+                    if e.errno == errno.ENOENT and failures and not os.path.isdir(src):
+                        # A peer swept our staging directory as litter after a
+                        # wait longer than stale_timeout; rebuild it.
+                        os.mkdir(src)
+                        self._write_holder_info(staging)
+                        continue
+                    if e.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                        raise
+                    failures += 1
+                else:
+                    self._attempts.extend([False] * failures + [True])
+                    return failures > 0
                 if self._try_break_stale():
-                    continue  # stale lock broken — retry mkdir immediately
-                if deadline is not None and time.monotonic() >= deadline:
+                    delay = 0.0
+                    continue  # stale lock broken — retry immediately
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
                     raise NFSLockTimeout(
                         f"Could not acquire lock {self.lock_path} "
                         f"within {self.timeout}s"
                     ) from None
-                time.sleep(self.poll_interval)
-            else:
-                break
+                # Jitter desynchronises waiters so they don't all hit the
+                # server on the same tick.
+                sleep = delay * (0.5 + random.random())
+                if deadline is not None:
+                    sleep = min(sleep, deadline - now)
+                _wait_for_release(released, sleep)
+                delay = min(max_delay, max(self.poll_interval, delay * 2, floor))
+        except BaseException:
+            self._attempts.extend([False] * failures)
+            raise
 
-        self._write_holder_info()
-        log.debug("Acquired lock %s", self.lock_path)
+    def _contention_delay(self, max_delay: float) -> float:
+        """Backoff floor proportional to the recent failed-attempt ratio."""
+        attempts = self._attempts
+        if not attempts:
+            return 0.0
+        return max_delay * attempts.count(False) / len(attempts)
 
     def release(self) -> None:
-        """Remove sentinel files and the lock directory."""
-        with contextlib.suppress(OSError):
-            self._holder_file.unlink(missing_ok=True)
-        with contextlib.suppress(OSError):
-            os.rmdir(self.lock_path)
+        """Move the lock directory aside; it is deleted in the background."""
+        # Renaming first means lock_path never exists as an empty directory,
+        # which a waiter's rename would silently replace.
+        self._stop_heartbeat()
+        tombstone = self._scratch_path("old")
+        try:
+            os.rename(self.lock_path, tombstone)
+        except OSError:
+            return
+        _notify_release(os.fspath(self.lock_path))
+        # The lock is free once renamed away; delete it off the caller's path.
+        _cleanup_executor().submit(_remove_lock_dir, tombstone)
         log.debug("Released lock %s", self.lock_path)
 
+    def _scratch_path(self, tag: str) -> Path:
+        """Unique sibling of ``lock_path`` for staging or tearing down a lock."""
+        name = f".{self.lock_path.name}.{tag}.{_PID}.{uuid.uuid4().hex}"
+        return self.lock_path.with_name(name)
+
     # ------------------------------------------------------------------
     # Holder info & staleness
     # ------------------------------------------------------------------
 
-    def _write_holder_info(self) -> None:
-        info = {
-            "hostname": socket.gethostname(),
-            "pid": os.getpid(),
-            "timestamp": time.time(),
-        }
-        # Write via low-level fd so we can fsync.
+    def _write_holder_info(self, lock_dir: Path) -> None:
+        # Fixed "hostname\npid\ntimestamp\n" lines; the trailing newline
+        # lets readers reject a partially written file.
+        info = _HOLDER_PREFIX + f"{time.time()}\n".encode()
         fd = os.open(
-            str(self._holder_file),
+            str(lock_dir / _HOLDER_FILE),
             os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
             0o644,
         )
         try:
-            os.write(fd, json.dumps(info).encode())
+            os.write(fd, info)
+            # On NFS the data may sit in the client cache until flushed; sync
+            # it here, in the staging directory, so the rename never publishes
+            # a lock whose holder.info the server has not got.
             os.fsync(fd)
         finally:
             os.close(fd)
 
-    def _read_holder_info(self) -> dict[str, Any] | None:
+    def _start_heartbeat(self) -> None:
+        self._heartbeat_stop.clear()
+        self._heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop, daemon=True
+        )
+        self._heartbeat_thread.start()
+
+    def _stop_heartbeat(self) -> None:
+        if self._heartbeat_thread is not None:
+            self._heartbeat_stop.set()
+            self._heartbeat_thread.join()
+            self._heartbeat_thread = None
+
+    def _heartbeat_loop(self) -> None:
+        interval = self.stale_timeout / 3
+        while not self._heartbeat_stop.wait(interval):
+            # A missed beat is harmless; the next one retries.
+            with contextlib.suppress(OSError):
+                self._refresh_holder_info()
+
+    def _refresh_holder_info(self) -> None:
+        """Re-stamp holder.info; write-then-rename so peers never see it torn."""
+        tmp = self.lock_path / _HOLDER_TMP
+        fd = os.open(str(tmp), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
         try:
-            result: dict[str, Any] = json.loads(self._holder_file.read_text())
-            return result
-        except (OSError, json.JSONDecodeError):
+            os.write(fd, _HOLDER_PREFIX + f"{time.time()}\n".encode())
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp, self.lock_path / _HOLDER_FILE)
+
+    def _read_holder_info(self, lock_dir: Path | None = None) -> dict[str, Any] | None:
+        path = (self.lock_path if lock_dir is None else lock_dir) / _HOLDER_FILE
+        try:
+            data = _read_small_file(os.fspath(path))
+        except OSError:
+            return None
+        try:
+            hostname, pid, timestamp, _ = data.split(b"\n", 3)
+            return {
+                "hostname": hostname.decode(),
+                "pid": int(pid),
+                "timestamp": float(timestamp),
+            }
+        except ValueError:
             return None
 
     def _try_break_stale(self) -> bool:
@@ -147,20 +414,73 @@ class NFSLock:
             info.get("hostname"),
             info.get("pid"),
         )
-        with contextlib.suppress(OSError):
-            self._holder_file.unlink(missing_ok=True)
+        tombstone = self._scratch_path("stale")
         try:
-            os.rmdir(self.lock_path)
+            os.rename(self.lock_path, tombstone)
         except OSError:
             return False
+        if self._read_holder_info(tombstone) != info:
+            # Another waiter broke the stale lock and re-acquired it between
+            # our read and rename; hand the live lock back.
+            try:
+                os.rename(tombstone, self.lock_path)
+            except OSError as e:
+                if e.errno not in (errno.ENOENT, errno.EEXIST, errno.ENOTEMPTY):
+                    raise
+                log.warning(
+                    "Could not restore live lock %s from %s (%s); its holder "
+                    "no longer owns lock_path",
+                    self.lock_path,
+                    tombstone,
+                    e.strerror,
+                )
+            return False
+        _cleanup_executor().submit(_remove_lock_dir, tombstone)
+        # A holder that died may have left other scratch directories too.
+        _cleanup_executor().submit(self._sweep_litter)
         return True
 
+    def _sweep_litter(self) -> None:
+        """Delete scratch siblings of ``lock_path`` left by dead processes.
+
+        Staging directories and tombstones are normally removed by their
+        owner, but not if it is killed first.  Each one carries its owner's
+        ``holder.info``, so it is removed once that holder is stale; one with
+        no readable ``holder.info`` is removed once older than
+        *stale_timeout*.
+        """
+        prefix = f".{self.lock_path.name}."
+        parent = self.lock_path.parent
+        try:
+            names = os.listdir(parent)
+        except OSError:
+            return
+        for name in names:
+            if not name.startswith(prefix):
+                continue
+            parts = name[len(prefix) :].split(".")
+            if len(parts) != 3 or parts[0] not in _SCRATCH_TAGS:
+                continue
+            path = parent / name
+            info = self._read_holder_info(path)
+            if info is None:
+                try:
+                    age = time.time() - path.stat().st_mtime
+                except OSError:
+                    continue
+                if age <= self.stale_timeout:
+                    continue
+            elif not self._is_stale(info):
+                continue
+            log.info("Removing leftover lock directory %s", path)
+            _remove_lock_dir(path)
+
     def _is_stale(self, info: dict[str, Any]) -> bool:
         hostname = info.get("hostname", "")
         pid = info.get("pid", -1)
         timestamp = info.get("timestamp", 0.0)
 
-        if hostname == socket.gethostname():
+        if hostname == _HOSTNAME:
             # Same host — check if the process is alive.
             try:
                 os.kill(pid, 0)
@@ -1,9 +1,12 @@
 # Copyright (c) 2026 Shareef Jalloq. MIT License — see LICENSE for details.
 
+import functools
+import itertools
 import logging
 import os
 import shlex
-from datetime import datetime
+import time
+from dataclasses import dataclass
 from pathlib import Path
 
 import pytest
@@ -162,6 +165,7 @@ def pytest_addoption(parser):
     )
 
 
+@functools.lru_cache(maxsize=4096)
 def _sanitise_name(node_id: str) -> str:
     """Convert a pytest node ID into a filesystem-safe directory name.
 
@@ -169,18 +173,36 @@ def _sanitise_name(node_id: str) -> str:
     """
     # Split nodeid into file path and test name(s)
     # e.g., "tests/test_foo.py::TestClass::test_method"
-    #     -> ["tests/test_foo.py", "TestClass", "test_method"]
-    parts = node_id.split("::")
-    file_path = parts[0]
-    test_parts = parts[1:]  # Could be [test_func] or [TestClass, test_method]
+    #     -> "tests/test_foo.py", "TestClass::test_method"
+    sep = node_id.find("::")
+    file_path = node_id if sep == -1 else node_id[:sep]
+    test_parts = "" if sep == -1 else node_id[sep + 2 :]
 
     # Extract module name: strip directory and .py extension
-    module = Path(file_path).stem
+    filename = file_path[file_path.rfind("/") + 1 :]
+    module = filename[:-3] if filename.endswith(".py") else filename
 
     # Join test parts (handles TestClass::test_method case)
-    test_name = "_".join(test_parts)
+    return f"{module}__{test_parts.replace('::', '_')}"
 
-    return f"{module}__{test_name}"
+
+def _flatten_build_args(
+    raw_build_args: list[str], filelist: str | None
+) -> tuple[str, ...]:
+    """shlex-split each ``--build-args`` value and prepend ``-f <filelist>``."""
+    build_args = itertools.chain.from_iterable(shlex.split(a) for a in raw_build_args)
+    if filelist:
+        # Resolve to an absolute path: the simulator runs from build_dir.
+        return ("-f", str(Path(filelist).resolve()), *build_args)
+    return tuple(build_args)
+
+
+def _parse_timescale(raw: str) -> tuple[str, ...]:
+    """Parse ``"1ns/1ps"`` into ``("1ns", "1ps")``; ``"1ns"`` into ``("1ns",)``."""
+    parts = raw.split("/")
+    if len(parts) == 2:
+        return (parts[0].strip(), parts[1].strip())
+    return (parts[0].strip(),)
 
 
 def _variant_name(waves: bool) -> str:
@@ -191,15 +213,15 @@ def _variant_name(waves: bool) -> str:
 @pytest.fixture(scope="session")
 def testrun_uid():
     """Timestamp string identifying this pytest invocation."""
-    return datetime.now().strftime("%Y%m%d_%H%M%S")
+    return time.strftime("%Y%m%d_%H%M%S")
 
 
 @pytest.fixture(scope="session")
 def sim_build_dir(request, testrun_uid):
     """Base output directory for this test run."""
-    base = Path(request.config.getoption("sim_build"))
-    regress = request.config.getoption("regress")
-    path = base / testrun_uid if regress else base
+    opts = request.config.option
+    base = Path(opts.sim_build)
+    path = base / testrun_uid if opts.regress else base
     path.mkdir(parents=True, exist_ok=True)
     return path
 
@@ -207,8 +229,7 @@ def sim_build_dir(request, testrun_uid):
 @pytest.fixture(scope="session")
 def build_dir(request, sim_build_dir):
     """Build directory for the compiled HDL."""
-    waves = request.config.getoption("waves")
-    subdir = _variant_name(waves)
+    subdir = _variant_name(request.config.option.waves)
     path = sim_build_dir / subdir
     path.mkdir(parents=True, exist_ok=True)
     return path
@@ -217,39 +238,23 @@ def build_dir(request, sim_build_dir):
 @pytest.fixture(scope="session")
 def runner(request, build_dir):
     """Session-scoped fixture that compiles the HDL design once."""
-    config = request.config
-
-    sim = config.getoption("simulator")
-    hdl_toplevel = config.getoption("hdl_toplevel")
-    hdl_library = config.getoption("hdl_library")
-    sources = config.getoption("sources")
-    filelist = config.getoption("filelist")
-    includes = config.getoption("includes")
-    defines = config.getoption("defines")
-    raw_build_args = config.getoption("build_args")
-    parameters = config.getoption("parameters")
-    waves = config.getoption("waves")
-    clean = config.getoption("clean")
-    timescale_raw = config.getoption("timescale")
-    verbose_sim = config.getoption("verbose_sim")
-
-    # Parse timescale "1ns/1ps" -> ("1ns", "1ps")
-    timescale = None
-    if timescale_raw:
-        parts = timescale_raw.split("/")
-        if len(parts) == 2:
-            timescale = (parts[0].strip(), parts[1].strip())
-        else:
-            timescale = (parts[0].strip(),)
-
-    # Flatten shlex-split build args
-    build_args = []
-    for arg in raw_build_args:
-        build_args.extend(shlex.split(arg))
-
-    # Handle filelist: resolve to absolute path and prepend -f <path> to build_args
-    if filelist:
-        build_args = ["-f", str(Path(filelist).resolve()), *build_args]
+    # Read the argparse namespace directly; getoption() only adds a
+    # per-call lookup/validation layer on top of it.
+    opts = request.config.option
+
+    sim = opts.simulator
+    hdl_toplevel = opts.hdl_toplevel
+    hdl_library = opts.hdl_library
+    sources = opts.sources
+    includes = opts.includes
+    defines = opts.defines
+    parameters = opts.parameters
+    waves = opts.waves
+    clean = opts.clean
+    timescale_raw = opts.timescale
+    verbose_sim = opts.verbose_sim
+
+    timescale = _parse_timescale(timescale_raw) if timescale_raw else None
 
     # Build defines dict
     defines_dict = {name: value for name, value in defines}
@@ -257,13 +262,13 @@ def runner(request, build_dir):
     # Build parameters dict
     parameters_dict = {name: value for name, value in parameters}
 
-    modules = config.getoption("modules")
+    modules = opts.modules
 
     runner_cls = get_hpc_runner(sim)
     runner = runner_cls()
     runner.modules = modules
 
-    capturing = config.getoption("capture") != "no"
+    capturing = opts.capture != "no"
 
     build_kwargs = dict(
         hdl_toplevel=hdl_toplevel,
@@ -272,7 +277,7 @@ def runner(request, build_dir):
         includes=[Path(i) for i in includes],
         defines=defines_dict,
         parameters=parameters_dict,
-        build_args=build_args,
+        build_args=list(_flatten_build_args(opts.build_args, opts.filelist)),
         build_dir=build_dir,
         clean=clean,
         waves=waves,
@@ -290,49 +295,79 @@ def runner(request, build_dir):
     return runner
 
 
-@pytest.fixture(scope="function")
-def test_session(request, runner, sim_build_dir):
-    """Per-test fixture providing a TestSession bound to a unique directory."""
-    config = request.config
-    hdl_toplevel = config.getoption("hdl_toplevel")
-    waves = config.getoption("waves")
-    hdl_toplevel_lang = config.getoption("hdl_toplevel_lang")
-    verbose_sim = config.getoption("verbose_sim")
-    gui = config.getoption("gui")
-    raw_test_args = config.getoption("test_args")
-    plusargs = config.getoption("plusargs")
-    raw_extra_env = config.getoption("extra_env")
-    seed = config.getoption("seed")
-    testcase = config.getoption("testcase")
-    test_filter = config.getoption("test_filter")
-    results_xml = config.getoption("results_xml")
+@dataclass(frozen=True)
+class _TestConfig:
+    """Per-test ``TestSession`` inputs that are constant for the whole session."""
+
+    simulator: str
+    hdl_toplevel: str | None
+    waves: bool
+    hdl_toplevel_lang: str | None
+    verbose_sim: bool
+    gui: bool
+    capturing: bool
+    test_args: tuple[str, ...]
+    plusargs: tuple[str, ...]
+    extra_env: dict[str, str]
+    seed: str | None
+    testcase: str | None
+    test_filter: str | None
+    results_xml: str | None
+
+
+@pytest.fixture(scope="session")
+def _parsed_test_config(request):
+    """Parse the test-time CLI options once per session."""
+    opts = request.config.option
 
     # Parse test_args (shlex-split each entry)
     test_args = []
-    for arg in raw_test_args:
+    for arg in opts.test_args:
         test_args.extend(shlex.split(arg))
 
     # Parse extra_env KEY=VAL entries
     extra_env = {}
-    for entry in raw_extra_env:
+    for entry in opts.extra_env:
         key, _, val = entry.partition("=")
         extra_env[key] = val
 
-    capturing = request.config.getoption("capture") != "no"
+    capturing = opts.capture != "no"
     logger.debug(f"pytest is capturing: {capturing}")
 
+    return _TestConfig(
+        simulator=opts.simulator,
+        hdl_toplevel=opts.hdl_toplevel,
+        waves=opts.waves,
+        hdl_toplevel_lang=opts.hdl_toplevel_lang,
+        verbose_sim=opts.verbose_sim,
+        gui=opts.gui,
+        capturing=capturing,
+        test_args=tuple(test_args),
+        plusargs=tuple(opts.plusargs),
+        extra_env=extra_env,
+        seed=opts.seed,
+        testcase=opts.testcase,
+        test_filter=opts.test_filter,
+        results_xml=opts.results_xml,
+    )
+
+
+@pytest.fixture(scope="function")
+def test_session(request, runner, sim_build_dir, _parsed_test_config):
+    """Per-test fixture providing a TestSession bound to a unique directory."""
+    cfg = _parsed_test_config
+
     # Derive test_module from the Python module containing the test
     test_module = request.module.__name__
 
     # Build a unique directory name from the test node ID
     node_id = request.node.nodeid
     safe_name = _sanitise_name(node_id)
-    variant = _variant_name(waves)
+    variant = _variant_name(cfg.waves)
     test_dir = sim_build_dir / safe_name / variant
-    test_dir.mkdir(parents=True, exist_ok=True)
 
-    sim = config.getoption("simulator")
-    if sim.lower() == "xcelium":
+    test_args = list(cfg.test_args)
+    if cfg.simulator.lower() == "xcelium":
         tmpdir = test_dir / "tmp"
         tmpdir.mkdir(parents=True, exist_ok=True)
         test_args.extend(["-cds_implicit_tmpdir", str(tmpdir)])
@@ -340,18 +375,18 @@ def test_session(request, runner, sim_build_dir):
     yield TestSession(
         runner=runner,
         directory=test_dir,
-        hdl_toplevel=hdl_toplevel,
+        hdl_toplevel=cfg.hdl_toplevel,
         test_module=test_module,
-        waves=waves,
-        log_file=test_dir / "sim.log" if capturing else None,
-        hdl_toplevel_lang=hdl_toplevel_lang,
-        verbose=verbose_sim,
-        gui=gui,
+        waves=cfg.waves,
+        log_file=test_dir / "sim.log" if cfg.capturing else None,
+        hdl_toplevel_lang=cfg.hdl_toplevel_lang,
+        verbose=cfg.verbose_sim,
+        gui=cfg.gui,
         test_args=test_args,
-        plusargs=plusargs,
-        extra_env=extra_env,
-        seed=seed,
-        testcase=testcase,
-        test_filter=test_filter,
-        results_xml=results_xml,
+        plusargs=list(cfg.plusargs),
+        extra_env=dict(cfg.extra_env),
+        seed=cfg.seed,
+        testcase=cfg.testcase,
+        test_filter=cfg.test_filter,
+        results_xml=cfg.results_xml,
     )
@@ -2,6 +2,8 @@
 
 """HPC-enabled cocotb runner classes."""
 
+import functools
+
 from cocotb_tools.runner import Icarus, Questa, Vcs, Verilator, Xcelium
 
 from .mixin import HpcExecutorMixin
@@ -55,12 +57,15 @@ _HPC_RUNNERS: dict[str, type] = {
 }
 
 
+_AVAILABLE_SIMS = ", ".join(sorted(_HPC_RUNNERS))
+
+
+@functools.cache
 def get_hpc_runner(sim_name: str) -> type:
     """Get an HPC-enabled runner class for the given simulator name."""
     try:
         return _HPC_RUNNERS[sim_name]
     except KeyError:
-        available = ", ".join(sorted(_HPC_RUNNERS))
         raise ValueError(
-            f"Unknown simulator: {sim_name!r}. Available: {available}"
+            f"Unknown simulator: {sim_name!r}. Available: {_AVAILABLE_SIMS}"
         ) from None
@@ -6,10 +6,10 @@ from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
-_MANAGED_KEYS = frozenset({"test_dir", "build_dir"})
+_MANAGED_KEYS = ("test_dir", "build_dir")
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TestSession:
     __test__ = False  # prevent pytest collection
     runner: object
@@ -28,22 +28,14 @@ class TestSession:
     testcase: str | None = None
     test_filter: str | None = None
     results_xml: str | None = None
-    _has_run: bool = field(default=False, repr=False)
+    _has_run: bool = field(default=False, init=False, repr=False)
+    _defaults: dict[str, object] = field(init=False, repr=False)
 
-    def run(self, **kwargs) -> Path:
-        """Run cocotb test(s) in the simulator. Delegates to runner.test()."""
-        if self._has_run:
-            raise RuntimeError("run() can only be called once per test")
-
-        conflicts = _MANAGED_KEYS & kwargs.keys()
-        if conflicts:
-            raise ValueError(
-                f"Cannot override fixture-managed keys: {conflicts}. "
-                f"Use CLI options (--sim-build, --waves) to control directories."
-            )
-
-        self._has_run = True
-        defaults = dict(
+    def __post_init__(self) -> None:
+        # The scalar fields are frozen, so their runner.test() arguments can
+        # be built once here.  The list/dict fields stay mutable (tests may
+        # append plusargs before calling run()) and are checked in run().
+        defaults: dict[str, object] = dict(
             hdl_toplevel=self.hdl_toplevel,
             test_module=self.test_module,
             test_dir=self.directory,
@@ -57,12 +49,6 @@ class TestSession:
             defaults["verbose"] = self.verbose
         if self.gui:
             defaults["gui"] = self.gui
-        if self.test_args:
-            defaults["test_args"] = self.test_args
-        if self.plusargs:
-            defaults["plusargs"] = self.plusargs
-        if self.extra_env:
-            defaults["extra_env"] = self.extra_env
         if self.seed is not None:
             defaults["seed"] = self.seed
         if self.testcase is not None:
@@ -71,17 +57,41 @@ class TestSession:
             defaults["test_filter"] = self.test_filter
         if self.results_xml is not None:
             defaults["results_xml"] = self.results_xml
+        object.__setattr__(self, "_defaults", defaults)
 
+    def run(self, **kwargs) -> Path:
+        """Run cocotb test(s) in the simulator. Delegates to runner.test()."""
+        if self._has_run:
+            raise RuntimeError("run() can only be called once per test")
+
+        conflicts = [k for k in _MANAGED_KEYS if k in kwargs]
+        if conflicts:
+            raise ValueError(
+                f"Cannot override fixture-managed keys: {conflicts}. "
+                f"Use CLI options (--sim-build, --waves) to control directories."
+            )
+
+        object.__setattr__(self, "_has_run", True)  # frozen; single-use flag
+        # Created here rather than by the fixture so tests that never run the
+        # simulator don't pay for an mkdir (slow on NFS).
+        self.directory.mkdir(parents=True, exist_ok=True)
         # Resolve user-provided relative log_file against test_dir
         if "log_file" in kwargs:
             lf = Path(kwargs["log_file"])
             if not lf.is_absolute():
                 kwargs["log_file"] = self.directory / lf
 
-        defaults.update(kwargs)
+        defaults = self._defaults | kwargs
+        if self.test_args:
+            defaults.setdefault("test_args", self.test_args)
+        if self.plusargs:
+            defaults.setdefault("plusargs", self.plusargs)
+        if self.extra_env:
+            defaults.setdefault("extra_env", self.extra_env)
 
-        logger.debug("TestSession.run() final arguments:")
-        for k, v in sorted(defaults.items()):
-            logger.debug("  %-20s = %s", k, v)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("TestSession.run() final arguments:")
+            for k, v in sorted(defaults.items()):
+                logger.debug("  %-20s = %s", k, v)
 
         return self.runner.test(**defaults)  # type: ignore[attr-defined, no-any-return]
@@ -1,6 +1,7 @@
 # Copyright (c) 2026 Shareef Jalloq. MIT License — see LICENSE for details.
 
 import subprocess
+import sys
 
 import pytest
 
@@ -9,9 +10,13 @@ pytest_plugins = ["pytester"]
 VERILATOR_MODULE = "verilator"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def _needs_verilator():
-    """Skip test if verilator module is not available."""
+    """Skip test if verilator module is not available.
+
+    Session-scoped so the ``module load`` probe runs once; pytest caches the
+    skip and re-raises it for every later test that requests the fixture.
+    """
     try:
         result = subprocess.run(
             ["bash", "-lc", f"module load {VERILATOR_MODULE} && which verilator"],
@@ -22,3 +27,21 @@ def _needs_verilator():
             pytest.skip(f"module {VERILATOR_MODULE} not available")
     except (FileNotFoundError, subprocess.TimeoutExpired):
         pytest.skip("module system not available")
+    return True
+
+
+@pytest.fixture(scope="session")
+def plugin_help(tmp_path_factory):
+    """``pytest --help`` output lines, captured once per session.
+
+    Runs from an empty directory so no project ini or conftest is picked up;
+    the plugin itself loads through its entry point.
+    """
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", "--help"],
+        cwd=tmp_path_factory.mktemp("help"),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout.splitlines()
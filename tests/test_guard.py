@@ -4,12 +4,13 @@
 
 from __future__ import annotations
 
+import os
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from pytest_cocotb.guard import CallOnce, _nfs_file_exists
+from pytest_cocotb.guard import CallOnce, _nfs_dir_listing, _nfs_file_exists
 
 
 @pytest.fixture()
@@ -23,16 +24,30 @@ class TestEnsureDone:
         fn = MagicMock()
         guard = CallOnce(path=build_dir, name="test", fn=fn)
 
+        guard._lock_dir.mkdir(parents=True)
+
         with patch("pytest_cocotb.guard.NFSLock") as mock_lock_cls:
             mock_lock = MagicMock()
             mock_lock_cls.return_value = mock_lock
-            mock_lock.__enter__ = MagicMock(return_value=mock_lock)
-            mock_lock.__exit__ = MagicMock(return_value=False)
             guard.ensure_done()
 
             mock_lock_cls.assert_called_once_with(
                 guard._lock_path, timeout=guard.timeout
             )
+            mock_lock.acquire.assert_called_once()
+            mock_lock.release.assert_called_once()
+
+    def test_creates_missing_lock_dir(self, build_dir):
+        """The lock directory is created on first use, then the lock taken."""
+        fn = MagicMock()
+        guard = CallOnce(path=build_dir, name="test", fn=fn)
+        assert not build_dir.exists()
+
+        guard.ensure_done()
+
+        assert guard._lock_dir.is_dir()
+        assert not guard._lock_path.exists()
+        fn.assert_called_once()
 
     def test_fn_called_once(self, build_dir):
         """Callable is only invoked on the first ensure_done call."""
@@ -44,6 +59,30 @@ class TestEnsureDone:
 
         fn.assert_called_once()
 
+    def test_done_marker_skips_lock(self, build_dir):
+        """Once .done exists, ensure_done returns without taking the lock."""
+        fn = MagicMock()
+        guard = CallOnce(path=build_dir, name="test", fn=fn)
+        guard.ensure_done()
+
+        with patch("pytest_cocotb.guard.NFSLock") as mock_lock_cls:
+            guard.ensure_done()
+
+        mock_lock_cls.assert_not_called()
+        fn.assert_called_once()
+
+    def test_fast_path_uses_nfs_safe_probe(self, build_dir):
+        """A cleaned marker seen as missing by the NFS-safe probe re-runs fn."""
+        fn = MagicMock()
+        guard = CallOnce(path=build_dir, name="test", fn=fn)
+        guard.ensure_done()
+
+        with patch("pytest_cocotb.guard._nfs_file_exists", return_value=False) as probe:
+            guard.ensure_done()
+
+        probe.assert_called_once_with(guard._done_file)
+        fn.assert_called_once()  # locked re-check still sees .done
+
     def test_fsync_called_not_sync(self, build_dir):
         """os.fsync is used instead of os.sync for marker creation."""
         fn = MagicMock()
@@ -59,7 +98,23 @@ class TestEnsureDone:
         ):
             guard.ensure_done()
 
-        assert mock_fsync.call_count >= 2  # file fd + parent dir fd
+        assert mock_fsync.call_count >= 1  # parent dir fd; file data via O_DSYNC
+
+    def test_marker_opened_with_dsync(self, build_dir):
+        """Marker data is made durable by O_DSYNC rather than a separate fsync."""
+        fn = MagicMock()
+        guard = CallOnce(path=build_dir, name="test", fn=fn)
+
+        with patch("pytest_cocotb._marker_io.os.open", wraps=os.open) as mock_open:
+            guard.ensure_done()
+
+        marker_flags = [
+            c.args[1]
+            for c in mock_open.call_args_list
+            if c.args[0] == guard._done_file.name and c.args[1] & os.O_CREAT
+        ]
+        assert marker_flags
+        assert all(flags & os.O_DSYNC for flags in marker_flags)
 
     def test_failure_creates_fail_marker(self, build_dir):
         fn = MagicMock(side_effect=RuntimeError("compile error"))
@@ -108,3 +163,21 @@ class TestNfsFileExists:
     def test_returns_false_for_missing_parent(self, tmp_path):
         f = tmp_path / "no_dir" / "file"
         assert _nfs_file_exists(f) is False
+
+
+class TestNfsDirListing:
+    def test_lists_present_names(self, tmp_path):
+        (tmp_path / "a.done").touch()
+        (tmp_path / "b.failed").touch()
+        assert _nfs_dir_listing(tmp_path) == {"a.done", "b.failed"}
+
+    def test_accepts_dir_fd(self, tmp_path):
+        (tmp_path / "a.done").touch()
+        fd = os.open(tmp_path, os.O_RDONLY)
+        try:
+            assert _nfs_dir_listing(fd) == {"a.done"}
+        finally:
+            os.close(fd)
+
+    def test_missing_dir_is_empty(self, tmp_path):
+        assert _nfs_dir_listing(tmp_path / "no_dir") == set()
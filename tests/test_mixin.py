@@ -0,0 +1,118 @@
+# Copyright (c) 2026 Shareef Jalloq. MIT License — see LICENSE for details.
+
+"""Tests for the HPC executor mixin helpers."""
+
+from __future__ import annotations
+
+import os
+import shlex
+from unittest.mock import patch
+
+import pytest
+from hpc_runner import JobStatus
+
+from pytest_cocotb.mixin import (
+    HpcExecutorMixin,
+    _cocotb_env_diff,
+    _join_command,
+    _valid_env_key,
+)
+
+
+class TestJoinCommand:
+    def test_safe_args_joined_verbatim(self):
+        cmd = ["verilator", "--cc", "-Wall", "rtl/counter.sv", "+define+W=8"]
+        assert _join_command(cmd) == " ".join(cmd)
+
+    @pytest.mark.parametrize(
+        "cmd",
+        [
+            ["echo", "hello world"],
+            ["echo", ""],
+            ["echo", "$HOME"],
+            ["echo", "a\nb"],
+            ["echo", "naïve"],
+        ],
+    )
+    def test_matches_shlex_join(self, cmd):
+        assert _join_command(cmd) == shlex.join(cmd)
+
+
+class TestValidEnvKey:
+    @pytest.mark.parametrize("key", ["PATH", "_X", "a1", "COCOTB_TEST_MODULES"])
+    def test_accepts_shell_names(self, key):
+        assert _valid_env_key(key)
+
+    @pytest.mark.parametrize(
+        "key", ["", "1ABC", "A-B", "A.B", "BASH_FUNC_x%%", "ÄB", "PATH\n"]
+    )
+    def test_rejects_invalid_names(self, key):
+        assert not _valid_env_key(key)
+
+
+class TestCocotbEnvDiff:
+    def test_unchanged_vars_dropped(self):
+        with patch.dict(os.environ, {"KEEP": "1"}, clear=True):
+            assert _cocotb_env_diff({"KEEP": "1"}) == ({}, {})
+
+    def test_new_and_replaced_vars(self):
+        with patch.dict(os.environ, {"OLD": "a"}, clear=True):
+            env_vars, env_append = _cocotb_env_diff({"OLD": "b", "NEW": "c"})
+        assert env_vars == {"OLD": "b", "NEW": "c"}
+        assert env_append == {}
+
+    def test_pathsep_append_extracted(self):
+        with patch.dict(os.environ, {"PATH": "/usr/bin"}, clear=True):
+            env_vars, env_append = _cocotb_env_diff(
+                {"PATH": f"/usr/bin{os.pathsep}/opt/cocotb/libs"}
+            )
+        assert env_vars == {}
+        assert env_append == {"PATH": "/opt/cocotb/libs"}
+
+    def test_invalid_keys_skipped(self):
+        with patch.dict(os.environ, {}, clear=True):
+            env_vars, _ = _cocotb_env_diff({"BASH_FUNC_x%%": "() { :; }"})
+        assert env_vars == {}
+
+    def test_keys_sorted(self):
+        with patch.dict(os.environ, {}, clear=True):
+            env_vars, _ = _cocotb_env_diff({"ZED": "1", "ALPHA": "2", "MID": "3"})
+        assert list(env_vars) == ["ALPHA", "MID", "ZED"]
+
+
+class _FakeRunner(HpcExecutorMixin):
+    def __init__(self, env):
+        self.modules = ["verilator"]
+        self.env = env
+        self.log_file = None
+
+
+@pytest.fixture()
+def mock_job_cls():
+    with patch("pytest_cocotb.mixin.Job") as job_cls:
+        result = job_cls.return_value.submit.return_value
+        result.wait.return_value = JobStatus.COMPLETED
+        yield job_cls
+
+
+class TestExecuteCmds:
+    def test_one_job_per_command(self, mock_job_cls, tmp_path):
+        runner = _FakeRunner({"NEW": "1"})
+        with patch(
+            "pytest_cocotb.mixin._cocotb_env_diff", wraps=_cocotb_env_diff
+        ) as diff:
+            runner._execute_cmds([["make", "a"], ["make", "b"]], tmp_path)
+
+        diff.assert_called_once()
+        commands = [c.kwargs["command"] for c in mock_job_cls.call_args_list]
+        assert commands == ["make a", "make b"]
+        for call in mock_job_cls.call_args_list:
+            assert call.kwargs["modules"] == ["verilator"]
+            assert call.kwargs["workdir"] == str(tmp_path)
+
+    def test_failed_job_raises(self, mock_job_cls, tmp_path):
+        result = mock_job_cls.return_value.submit.return_value
+        result.wait.return_value = JobStatus.FAILED
+        result.read_stdout.return_value = ""
+        with pytest.raises(RuntimeError, match="FAILED"):
+            _FakeRunner({})._execute_cmds([["false"]], tmp_path)
@@ -1,17 +1,29 @@
 # Copyright (c) 2026 Shareef Jalloq. MIT License — see LICENSE for details.
 
-"""Tests for the NFS-safe mkdir-based lock."""
+"""Tests for the NFS-safe rename-based lock."""
 
 from __future__ import annotations
 
-import json
+import errno
 import os
+import socket
 import threading
 import time
+from unittest.mock import patch
 
 import pytest
 
-from pytest_cocotb.nfs_lock import NFSLock, NFSLockTimeout
+from pytest_cocotb import nfs_lock
+from pytest_cocotb.nfs_lock import _CONTENTION_WINDOW, NFSLock, NFSLockTimeout
+
+
+def _format_holder(info: dict) -> str:
+    return f"{info['hostname']}\n{info['pid']}\n{info['timestamp']}\n"
+
+
+def _drain_cleanup() -> None:
+    """Wait for background lock-directory removals queued so far."""
+    nfs_lock._cleanup_executor().submit(lambda: None).result()
 
 
 @pytest.fixture()
@@ -44,20 +56,123 @@ class TestAcquireRelease:
             raise RuntimeError("boom")
         assert not lock_path.exists()
 
+    def test_instance_is_reusable(self, lock_path):
+        lock = NFSLock(lock_path)
+        for _ in range(3):
+            with lock:
+                assert lock_path.is_dir()
+            assert not lock_path.exists()
+
+    def test_no_scratch_dirs_left_behind(self, lock_path):
+        with NFSLock(lock_path):
+            assert os.listdir(lock_path.parent) == [lock_path.name]
+        _drain_cleanup()
+        assert os.listdir(lock_path.parent) == []
+
+    def test_release_does_not_wait_for_cleanup(self, lock_path):
+        allow_rmdir = threading.Event()
+        real_rmdir = os.rmdir
+
+        def slow_rmdir(path):
+            allow_rmdir.wait(timeout=2)
+            real_rmdir(path)
+
+        with patch("pytest_cocotb.nfs_lock.os.rmdir", side_effect=slow_rmdir):
+            lock = NFSLock(lock_path)
+            lock.acquire()
+            start = time.monotonic()
+            lock.release()
+            assert time.monotonic() - start < 1
+            assert not lock_path.exists()
+            allow_rmdir.set()
+            _drain_cleanup()
+        assert os.listdir(lock_path.parent) == []
+
+    def test_missing_parent_raises(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            NFSLock(tmp_path / "missing" / "test.lock").acquire()
+
+    def test_empty_leftover_dir_is_taken_over(self, lock_path):
+        os.mkdir(lock_path)
+        with NFSLock(lock_path, timeout=0.2):
+            assert (lock_path / "holder.info").exists()
+
 
 class TestHolderInfo:
-    def test_holder_info_is_valid_json(self, lock_path):
+    def test_holder_info_format(self, lock_path):
         lock = NFSLock(lock_path)
         lock.acquire()
         try:
-            info = json.loads((lock_path / "holder.info").read_text())
-            assert "hostname" in info
-            assert "pid" in info
-            assert "timestamp" in info
-            assert info["pid"] == os.getpid()
+            text = (lock_path / "holder.info").read_text()
+            hostname, pid, timestamp = text.splitlines()
+            assert hostname == socket.gethostname()
+            assert int(pid) == os.getpid()
+            assert float(timestamp) <= time.time()
         finally:
             lock.release()
 
+    def test_truncated_holder_info_is_ignored(self, lock_path):
+        os.mkdir(lock_path)
+        (lock_path / "holder.info").write_text("some-host\n123\n")
+        assert NFSLock(lock_path)._read_holder_info() is None
+
+    @pytest.mark.skipif(not nfs_lock._O_NOATIME, reason="requires O_NOATIME")
+    def test_read_falls_back_without_noatime_permission(self, lock_path):
+        os.mkdir(lock_path)
+        (lock_path / "holder.info").write_text("some-host\n123\n1.5\n")
+        real_open = os.open
+
+        def fake_open(path, flags, *args, **kwargs):
+            if flags & nfs_lock._O_NOATIME:
+                raise PermissionError
+            return real_open(path, flags, *args, **kwargs)
+
+        with patch("pytest_cocotb.nfs_lock.os.open", side_effect=fake_open):
+            info = NFSLock(lock_path)._read_holder_info()
+        assert info == {"hostname": "some-host", "pid": 123, "timestamp": 1.5}
+
+    def test_holder_info_synced_before_rename(self, lock_path):
+        """holder.info reaches stable storage before the lock is published."""
+        published = []
+        real_fsync = os.fsync
+
+        def fsync(fd):
+            published.append(lock_path.exists())
+            real_fsync(fd)
+
+        with patch("pytest_cocotb.nfs_lock.os.fsync", side_effect=fsync):
+            NFSLock(lock_path).acquire()
+        assert published == [False]
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+    def test_cached_pid_refreshed_after_fork(self):
+        pid = os.fork()
+        if pid == 0:
+            expected = f"{socket.gethostname()}\n{os.getpid()}\n".encode()
+            ok = os.getpid() == nfs_lock._PID and expected == nfs_lock._HOLDER_PREFIX
+            os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+
+
+class TestHeartbeat:
+    def test_heartbeat_refreshes_timestamp(self, lock_path):
+        with NFSLock(lock_path, stale_timeout=0.3, heartbeat=True) as lock:
+            first = lock._read_holder_info()
+            time.sleep(0.5)
+            info = lock._read_holder_info()
+            assert info["timestamp"] > first["timestamp"]
+
+            # Seen from another host, the live holder is never stale.
+            info["hostname"] = "some-other-host"
+            assert not NFSLock(lock_path, stale_timeout=0.3)._is_stale(info)
+        assert not lock_path.exists()
+        assert lock._heartbeat_thread is None
+
+    def test_no_heartbeat_by_default(self, lock_path):
+        with NFSLock(lock_path) as lock:
+            assert lock._heartbeat_thread is None
+
 
 class TestBlocking:
     def test_second_acquire_blocks_until_release(self, lock_path):
@@ -85,6 +200,25 @@ class TestBlocking:
         t2.join(timeout=5)
         assert acquired.is_set()
 
+    def test_local_release_wakes_waiter(self, lock_path):
+        """A release in this process cuts a waiter's backoff sleep short."""
+        holder = NFSLock(lock_path)
+        holder.acquire()
+        acquired_at = []
+
+        def waiter():
+            with NFSLock(lock_path, poll_interval=5.0, max_poll_interval=5.0):
+                acquired_at.append(time.monotonic())
+
+        t = threading.Thread(target=waiter)
+        t.start()
+        time.sleep(0.2)  # let the waiter fall into its 2.5s+ backoff
+        released_at = time.monotonic()
+        holder.release()
+        t.join(timeout=10)
+
+        assert acquired_at[0] - released_at < 1.0
+
 
 class TestTimeout:
     def test_timeout_raises(self, lock_path):
@@ -97,24 +231,111 @@ class TestTimeout:
             "timestamp": time.time(),
         }
         holder = lock_path / "holder.info"
-        holder.write_text(json.dumps(info))
+        holder.write_text(_format_holder(info))
 
         with pytest.raises(NFSLockTimeout):
             NFSLock(lock_path, timeout=0.2, poll_interval=0.05).acquire()
+        assert os.listdir(lock_path.parent) == [lock_path.name]
+
+
+class TestBackoff:
+    def test_first_retry_immediate_then_bounded(self, lock_path):
+        os.mkdir(lock_path)
+        info = {
+            "hostname": "some-other-host",
+            "pid": 999999,
+            "timestamp": time.time(),
+        }
+        (lock_path / "holder.info").write_text(_format_holder(info))
+
+        sleeps = []
+        with (
+            patch(
+                "pytest_cocotb.nfs_lock._wait_for_release",
+                side_effect=lambda cond, timeout: sleeps.append(timeout),
+            ),
+            pytest.raises(NFSLockTimeout),
+        ):
+            NFSLock(
+                lock_path, timeout=0.05, poll_interval=0.01, max_poll_interval=0.02
+            ).acquire()
+
+        assert sleeps[0] == 0
+        assert all(s <= 0.02 * 1.5 for s in sleeps)
+
+    def test_fresh_lock_ramps_exponentially(self, lock_path):
+        """A waiter's own failures don't pin its sleeps at the cap."""
+        os.mkdir(lock_path)
+        info = {
+            "hostname": "some-other-host",
+            "pid": 999999,
+            "timestamp": time.time(),
+        }
+        (lock_path / "holder.info").write_text(_format_holder(info))
+
+        sleeps = []
+
+        def fake_wait(cond, timeout):
+            sleeps.append(timeout)
+            if len(sleeps) == 6:
+                raise KeyboardInterrupt
+
+        with (
+            patch("pytest_cocotb.nfs_lock._wait_for_release", side_effect=fake_wait),
+            patch("pytest_cocotb.nfs_lock.random.random", return_value=0.5),
+            pytest.raises(KeyboardInterrupt),
+        ):
+            NFSLock(
+                lock_path, timeout=-1, poll_interval=0.01, max_poll_interval=1.0
+            ).acquire()
+
+        assert sleeps == pytest.approx([0.0, 0.01, 0.02, 0.04, 0.08, 0.16])
+
+    def test_recent_contention_skips_immediate_retry(self, lock_path):
+        os.mkdir(lock_path)
+        info = {
+            "hostname": "some-other-host",
+            "pid": 999999,
+            "timestamp": time.time(),
+        }
+        (lock_path / "holder.info").write_text(_format_holder(info))
+
+        lock = NFSLock(
+            lock_path, timeout=0.2, poll_interval=0.01, max_poll_interval=0.02
+        )
+        lock._attempts.extend([False] * _CONTENTION_WINDOW)
+        sleeps = []
+        with (
+            patch(
+                "pytest_cocotb.nfs_lock._wait_for_release",
+                side_effect=lambda cond, timeout: sleeps.append(timeout),
+            ),
+            pytest.raises(NFSLockTimeout),
+        ):
+            lock.acquire()
+
+        assert sleeps[0] >= 0.02 * 0.5
+
+    def test_contention_history_shared_across_instances(self, lock_path):
+        """A fresh NFSLock sees the history of earlier locks on the same path."""
+        first = NFSLock(lock_path)
+        first._attempts.extend([False] * _CONTENTION_WINDOW)
+
+        second = NFSLock(lock_path)
+        assert second._contention_delay(0.5) == pytest.approx(0.5)
+        assert NFSLock(lock_path.with_name("other"))._contention_delay(0.5) == 0.0
 
 
 class TestStaleLock:
     def test_stale_lock_dead_pid_is_broken(self, lock_path):
         """A lock held by a dead local process is considered stale."""
         os.mkdir(lock_path)
-        import socket
-
         info = {
             "hostname": socket.gethostname(),
             "pid": 2**22 - 1,  # almost certainly not running
             "timestamp": time.time(),
         }
-        (lock_path / "holder.info").write_text(json.dumps(info))
+        (lock_path / "holder.info").write_text(_format_holder(info))
 
         lock = NFSLock(lock_path, timeout=1.0, poll_interval=0.05)
         lock.acquire()
@@ -123,6 +344,27 @@ class TestStaleLock:
         finally:
             lock.release()
 
+    def test_failed_restamp_releases_lock(self, lock_path):
+        """If re-stamping holder.info after a wait fails, the lock is freed."""
+        os.mkdir(lock_path)
+        info = {
+            "hostname": socket.gethostname(),
+            "pid": 2**22 - 1,  # dead, so the wait ends by breaking it
+            "timestamp": time.time(),
+        }
+        (lock_path / "holder.info").write_text(_format_holder(info))
+
+        with (
+            patch.object(
+                NFSLock,
+                "_refresh_holder_info",
+                side_effect=OSError(errno.ENOSPC, "No space left on device"),
+            ),
+            pytest.raises(OSError, match="No space"),
+        ):
+            NFSLock(lock_path, timeout=1.0).acquire()
+        assert not lock_path.exists()
+
     def test_stale_lock_old_timestamp_is_broken(self, lock_path):
         """A lock with an expired timestamp from a remote host is stale."""
         os.mkdir(lock_path)
@@ -131,7 +373,7 @@ class TestStaleLock:
             "pid": 12345,
             "timestamp": time.time() - 99999,
         }
-        (lock_path / "holder.info").write_text(json.dumps(info))
+        (lock_path / "holder.info").write_text(_format_holder(info))
 
         lock = NFSLock(lock_path, timeout=1.0, stale_timeout=100, poll_interval=0.05)
         lock.acquire()
@@ -141,6 +383,117 @@ class TestStaleLock:
             lock.release()
 
 
+class TestStaleBreakRace:
+    """A lock re-acquired between the stale probe and the rename is handed back."""
+
+    @pytest.fixture
+    def racing_lock(self, lock_path):
+        os.mkdir(lock_path)
+        stale = {"hostname": "remote", "pid": 1, "timestamp": 0.0}
+        (lock_path / "holder.info").write_text(_format_holder(stale))
+        lock = NFSLock(lock_path, stale_timeout=1)
+        live = dict(stale, timestamp=time.time())
+        # The probe sees the stale holder; the tombstone shows the live one.
+        with patch.object(NFSLock, "_read_holder_info", side_effect=[stale, live]):
+            yield lock
+
+    def _rename_back_fails(self, err):
+        real_rename = os.rename
+
+        def rename(src, dst):
+            if os.path.basename(os.fspath(src)).startswith(".test.lock.stale"):
+                raise OSError(err, os.strerror(err))
+            real_rename(src, dst)
+
+        return patch("pytest_cocotb.nfs_lock.os.rename", side_effect=rename)
+
+    def test_live_lock_restored(self, racing_lock, lock_path):
+        assert racing_lock._try_break_stale() is False
+        assert (lock_path / "holder.info").exists()
+
+    def test_restore_conflict_logged(self, racing_lock, caplog):
+        with self._rename_back_fails(errno.ENOTEMPTY):
+            assert racing_lock._try_break_stale() is False
+        assert "Could not restore live lock" in caplog.text
+
+    def test_unexpected_restore_error_raised(self, racing_lock):
+        with self._rename_back_fails(errno.EIO), pytest.raises(OSError):
+            racing_lock._try_break_stale()
+
+
+class TestLitterSweep:
+    """Scratch directories left by killed processes are swept up."""
+
+    DEAD_PID = 2**22 - 1  # almost certainly not running
+
+    def _scratch(self, lock_path, tag, pid, holder=True):
+        path = lock_path.with_name(f".{lock_path.name}.{tag}.{pid}.{'0' * 32}")
+        os.mkdir(path)
+        if holder:
+            info = {"hostname": socket.gethostname(), "pid": pid, "timestamp": 0}
+            (path / "holder.info").write_text(_format_holder(info))
+        return path
+
+    def test_dead_holders_swept_on_acquire(self, lock_path):
+        dead = [
+            self._scratch(lock_path, tag, self.DEAD_PID)
+            for tag in ("new", "old", "stale")
+        ]
+        live = self._scratch(lock_path, "new", os.getpid())
+
+        with NFSLock(lock_path):
+            pass
+        _drain_cleanup()
+
+        assert not any(p.exists() for p in dead)
+        assert live.exists()
+
+    def test_holderless_dir_swept_only_when_old(self, lock_path):
+        fresh = self._scratch(lock_path, "new", self.DEAD_PID, holder=False)
+        old = self._scratch(lock_path, "old", self.DEAD_PID, holder=False)
+        os.utime(old, (0, 0))
+
+        with NFSLock(lock_path, stale_timeout=60):
+            pass
+        _drain_cleanup()
+
+        assert fresh.exists()
+        assert not old.exists()
+
+    def test_unrelated_siblings_kept(self, lock_path):
+        other = lock_path.with_name(f".{lock_path.name}.backup")
+        os.mkdir(other)
+
+        with NFSLock(lock_path):
+            pass
+        _drain_cleanup()
+
+        assert other.exists()
+
+    def test_swept_staging_rebuilt(self, lock_path):
+        """A waiter whose staging directory is swept mid-wait rebuilds it."""
+        os.mkdir(lock_path)
+        info = {"hostname": "some-other-host", "pid": 1, "timestamp": time.time()}
+        (lock_path / "holder.info").write_text(_format_holder(info))
+
+        def swept_and_released(cond, timeout):
+            for name in os.listdir(lock_path.parent):
+                if ".new." in name:
+                    nfs_lock._remove_lock_dir(lock_path.parent / name)
+            nfs_lock._remove_lock_dir(lock_path)
+
+        lock = NFSLock(lock_path, timeout=1.0)
+        with patch(
+            "pytest_cocotb.nfs_lock._wait_for_release",
+            side_effect=swept_and_released,
+        ):
+            lock.acquire()
+        try:
+            assert lock._read_holder_info()["pid"] == os.getpid()
+        finally:
+            lock.release()
+
+
 class TestConcurrency:
     def test_n_threads_no_races(self, lock_path):
         """N concurrent threads each acquire/release without data races."""
@@ -149,8 +502,9 @@ class TestConcurrency:
         iterations = 5
 
         def worker():
+            lock = NFSLock(lock_path, poll_interval=0.01)
             for _ in range(iterations):
-                with NFSLock(lock_path, poll_interval=0.01):
+                with lock:
                     val = counter["value"]
                     time.sleep(0.001)
                     counter["value"] = val + 1
@@ -160,5 +514,6 @@ class TestConcurrency:
             t.start()
         for t in threads:
             t.join(timeout=30)
+            assert not t.is_alive()
 
         assert counter["value"] == n_threads * iterations
@@ -1,170 +1,222 @@
 # Copyright (c) 2026 Shareef Jalloq. MIT License — see LICENSE for details.
 
-from pathlib import Path
+import dataclasses
+import os
+from types import MappingProxyType
 from unittest.mock import MagicMock
 
 import pytest
 
 from conftest import VERILATOR_MODULE
-from pytest_cocotb.plugin import _sanitise_name, _variant_name
+from pytest_cocotb.plugin import (
+    _flatten_build_args,
+    _parse_timescale,
+    _sanitise_name,
+    _variant_name,
+)
 from pytest_cocotb.session import TestSession
 
+_DEFAULT_SESSION_KW = MappingProxyType(
+    {"hdl_toplevel": "top", "test_module": "test_example"}
+)
+
 # ---------- TestSession.run() single-use guard ----------
 
 
-class TestTestSession:
-    def _make_session(self, **kwargs):
-        defaults = dict(
-            runner=MagicMock(),
-            directory=Path("/tmp/test"),
-            hdl_toplevel="top",
-            test_module="test_example",
+@pytest.fixture
+def session_factory(tmp_path):
+    """Build a TestSession with a fresh mock runner; kwargs override defaults."""
+
+    def _make(**kwargs):
+        return TestSession(
+            **{
+                **_DEFAULT_SESSION_KW,
+                "runner": MagicMock(),
+                "directory": tmp_path / "test",
+                **kwargs,
+            }
         )
-        defaults.update(kwargs)
-        return TestSession(**defaults)
 
-    def test_run_delegates_to_runner(self):
-        session = self._make_session()
+    return _make
+
+
+class TestTestSession:
+    def test_run_delegates_to_runner(self, session_factory):
+        session = session_factory()
         session.run(testcase="my_test", seed=42)
 
         session.runner.test.assert_called_once_with(
             hdl_toplevel="top",
             test_module="test_example",
-            test_dir=Path("/tmp/test"),
+            test_dir=session.directory,
             waves=False,
             testcase="my_test",
             seed=42,
         )
 
-    def test_run_kwargs_override_defaults(self):
-        session = self._make_session()
+    def test_run_creates_directory(self, session_factory):
+        session = session_factory()
+        assert not session.directory.exists()
+        session.run()
+        assert session.directory.is_dir()
+
+    def test_run_kwargs_override_defaults(self, session_factory):
+        session = session_factory()
         session.run(test_module="overridden_module")
 
         call_kwargs = session.runner.test.call_args.kwargs
         assert call_kwargs["test_module"] == "overridden_module"
 
-    def test_run_single_use_guard(self):
-        session = self._make_session()
+    def test_run_single_use_guard(self, session_factory):
+        session = session_factory()
         session.run()
 
         with pytest.raises(RuntimeError, match="once per test"):
             session.run()
 
-    def test_waves_passed_through(self):
-        session = self._make_session(waves=True)
+    def test_waves_passed_through(self, session_factory):
+        session = session_factory(waves=True)
         session.run()
 
         session.runner.test.assert_called_once()
         call_kwargs = session.runner.test.call_args.kwargs
         assert call_kwargs["waves"] is True
 
-    def test_rejects_test_dir_override(self):
-        session = self._make_session()
+    def test_fields_are_frozen(self, session_factory):
+        session = session_factory()
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            session.seed = 1
+
+    def test_run_flag_not_constructor_argument(self, session_factory):
+        with pytest.raises(TypeError):
+            session_factory(_has_run=True)
+
+    def test_rejects_test_dir_override(self, session_factory):
+        session = session_factory()
         with pytest.raises(ValueError, match="fixture-managed"):
             session.run(test_dir="/somewhere/else")
 
-    def test_rejects_build_dir_override(self):
-        session = self._make_session()
+    def test_rejects_build_dir_override(self, session_factory):
+        session = session_factory()
         with pytest.raises(ValueError, match="fixture-managed"):
             session.run(build_dir="/somewhere/else")
 
-    def test_hdl_toplevel_lang_passed_through(self):
-        session = self._make_session(hdl_toplevel_lang="verilog")
+    def test_hdl_toplevel_lang_passed_through(self, session_factory):
+        session = session_factory(hdl_toplevel_lang="verilog")
         session.run()
         call_kwargs = session.runner.test.call_args.kwargs
         assert call_kwargs["hdl_toplevel_lang"] == "verilog"
 
-    def test_hdl_toplevel_lang_omitted_when_none(self):
-        session = self._make_session()
+    def test_hdl_toplevel_lang_omitted_when_none(self, session_factory):
+        session = session_factory()
         session.run()
         call_kwargs = session.runner.test.call_args.kwargs
         assert "hdl_toplevel_lang" not in call_kwargs
 
-    def test_verbose_passed_through(self):
-        session = self._make_session(verbose=True)
+    def test_verbose_passed_through(self, session_factory):
+        session = session_factory(verbose=True)
         session.run()
         call_kwargs = session.runner.test.call_args.kwargs
         assert call_kwargs["verbose"] is True
 
-    def test_verbose_omitted_when_false(self):
-        session = self._make_session()
+    def test_verbose_omitted_when_false(self, session_factory):
+        session = session_factory()
         session.run()
         call_kwargs = session.runner.test.call_args.kwargs
         assert "verbose" not in call_kwargs
 
-    def test_gui_passed_through(self):
-        session = self._make_session(gui=True)
+    def test_gui_passed_through(self, session_factory):
+        session = session_factory(gui=True)
         session.run()
         call_kwargs = session.runner.test.call_args.kwargs
         assert call_kwargs["gui"] is True
 
-    def test_test_args_passed_through(self):
-        session = self._make_session(test_args=["--foo", "--bar"])
+    def test_test_args_passed_through(self, session_factory):
+        session = session_factory(test_args=["--foo", "--bar"])
         session.run()
         call_kwargs = session.runner.test.call_args.kwargs
         assert call_kwargs["test_args"] == ["--foo", "--bar"]
 
-    def test_test_args_omitted_when_empty(self):
-        session = self._make_session()
+    def test_test_args_omitted_when_empty(self, session_factory):
+        session = session_factory()
         session.run()
         call_kwargs = session.runner.test.call_args.kwargs
         assert "test_args" not in call_kwargs
 
-    def test_plusargs_passed_through(self):
-        session = self._make_session(plusargs=["+foo", "+bar"])
+    def test_plusargs_passed_through(self, session_factory):
+        session = session_factory(plusargs=["+foo", "+bar"])
         session.run()
         call_kwargs = session.runner.test.call_args.kwargs
         assert call_kwargs["plusargs"] == ["+foo", "+bar"]
 
-    def test_extra_env_passed_through(self):
-        session = self._make_session(extra_env={"KEY": "VAL"})
+    def test_plusargs_appended_after_construction(self, session_factory):
+        session = session_factory()
+        session.plusargs.append("+late")
+        session.run()
+        call_kwargs = session.runner.test.call_args.kwargs
+        assert call_kwargs["plusargs"] == ["+late"]
+
+    def test_extra_env_passed_through(self, session_factory):
+        session = session_factory(extra_env={"KEY": "VAL"})
         session.run()
         call_kwargs = session.runner.test.call_args.kwargs
         assert call_kwargs["extra_env"] == {"KEY": "VAL"}
 
-    def test_extra_env_omitted_when_empty(self):
-        session = self._make_session()
+    def test_extra_env_omitted_when_empty(self, session_factory):
+        session = session_factory()
         session.run()
         call_kwargs = session.runner.test.call_args.kwargs
         assert "extra_env" not in call_kwargs
 
-    def test_seed_passed_through(self):
-        session = self._make_session(seed="12345")
+    def test_seed_passed_through(self, session_factory):
+        session = session_factory(seed="12345")
         session.run()
         call_kwargs = session.runner.test.call_args.kwargs
         assert call_kwargs["seed"] == "12345"
 
-    def test_seed_omitted_when_none(self):
-        session = self._make_session()
+    def test_seed_omitted_when_none(self, session_factory):
+        session = session_factory()
         session.run()
         call_kwargs = session.runner.test.call_args.kwargs
         assert "seed" not in call_kwargs
 
-    def test_testcase_passed_through(self):
-        session = self._make_session(testcase="my_test")
+    def test_testcase_passed_through(self, session_factory):
+        session = session_factory(testcase="my_test")
         session.run()
         call_kwargs = session.runner.test.call_args.kwargs
         assert call_kwargs["testcase"] == "my_test"
 
-    def test_test_filter_passed_through(self):
-        session = self._make_session(test_filter="test_.*")
+    def test_test_filter_passed_through(self, session_factory):
+        session = session_factory(test_filter="test_.*")
         session.run()
         call_kwargs = session.runner.test.call_args.kwargs
         assert call_kwargs["test_filter"] == "test_.*"
 
-    def test_results_xml_passed_through(self):
-        session = self._make_session(results_xml="results.xml")
+    def test_results_xml_passed_through(self, session_factory):
+        session = session_factory(results_xml="results.xml")
         session.run()
         call_kwargs = session.runner.test.call_args.kwargs
         assert call_kwargs["results_xml"] == "results.xml"
 
-    def test_kwargs_override_new_fields(self):
-        session = self._make_session(seed="111", testcase="default_test")
+    def test_kwargs_override_new_fields(self, session_factory):
+        session = session_factory(seed="111", testcase="default_test")
         session.run(seed="999", testcase="override_test")
         call_kwargs = session.runner.test.call_args.kwargs
         assert call_kwargs["seed"] == "999"
         assert call_kwargs["testcase"] == "override_test"
 
+    def test_arguments_logged_at_debug(self, caplog, session_factory):
+        session = session_factory(seed="42")
+        with caplog.at_level("DEBUG", logger="pytest_cocotb.session"):
+            session.run()
+        assert any("seed" in r.getMessage() for r in caplog.records)
+
+    def test_kwargs_override_list_fields(self, session_factory):
+        session = session_factory(plusargs=["+default"])
+        session.run(plusargs=["+override"])
+        call_kwargs = session.runner.test.call_args.kwargs
+        assert call_kwargs["plusargs"] == ["+override"]
+
 
 # ---------- Name sanitisation ----------
 
@@ -189,6 +241,10 @@ class TestSanitiseName:
         result = _sanitise_name("test_foo.py::test_bar[param1-param2]")
         assert result == "test_foo__test_bar[param1-param2]"
 
+    def test_file_only_nodeid(self):
+        # A bare module node id has no test part
+        assert _sanitise_name("tests/test_foo.py") == "test_foo__"
+
 
 # ---------- Variant name ----------
 
@@ -201,44 +257,42 @@ class TestVariantName:
         assert _variant_name(True) == "build_waves"
 
 
-# ---------- Timescale parsing ----------
+class TestFlattenBuildArgs:
+    def test_shlex_split(self):
+        assert _flatten_build_args(["-Wall '-O 3'", "-x"], None) == (
+            "-Wall",
+            "-O 3",
+            "-x",
+        )
+
+    def test_filelist_prepended(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        result = _flatten_build_args(["-x"], "sources.f")
+        assert result == ("-f", str(tmp_path / "sources.f"), "-x")
 
 
 class TestTimescaleParsing:
-    """Test the timescale string parsing in the runner fixture."""
+    """Test the timescale string parsing used by the runner fixture."""
 
     def test_timescale_split(self):
         """'1ns/1ps' should parse to ('1ns', '1ps') tuple."""
-        raw = "1ns/1ps"
-        parts = raw.split("/")
-        result = (parts[0].strip(), parts[1].strip())
-        assert result == ("1ns", "1ps")
+        assert _parse_timescale("1ns/1ps") == ("1ns", "1ps")
 
     def test_timescale_with_spaces(self):
         """'1ns / 1ps' should parse to ('1ns', '1ps') tuple."""
-        raw = "1ns / 1ps"
-        parts = raw.split("/")
-        result = (parts[0].strip(), parts[1].strip())
-        assert result == ("1ns", "1ps")
+        assert _parse_timescale("1ns / 1ps") == ("1ns", "1ps")
 
     def test_timescale_single_value(self):
         """'1ns' with no slash should produce single-element tuple."""
-        raw = "1ns"
-        parts = raw.split("/")
-        if len(parts) == 2:
-            result = (parts[0].strip(), parts[1].strip())
-        else:
-            result = (parts[0].strip(),)
-        assert result == ("1ns",)
+        assert _parse_timescale("1ns") == ("1ns",)
 
 
 # ---------- CLI option registration ----------
 
 
-def test_options_registered(pytester):
+def test_options_registered(plugin_help):
     """Verify plugin options are registered when the plugin is loaded."""
-    result = pytester.runpytest_subprocess("--help")
-    result.stdout.fnmatch_lines(
+    pytest.LineMatcher(plugin_help).fnmatch_lines(
         [
             "*--sim*",
             "*--hdl-toplevel*",
@@ -408,16 +462,23 @@ def test_counter(test_session):
 
 def _get_build_artifact_mtimes(build_dir):
     """Return a dict of {relative_path: mtime} for all files in build_dir."""
-    mtimes = {}
-    for p in build_dir.rglob("*"):
-        if p.is_file() and p.suffix != ".log":
-            mtimes[str(p.relative_to(build_dir))] = p.stat().st_mtime
-    return mtimes
+    # os.walk reads directories with scandir; slicing off the base prefix
+    # avoids a relpath()/relative_to() call per file.
+    base = len(os.path.join(build_dir, ""))
+    return {
+        path[base:]: os.stat(path).st_mtime
+        for root, _, files in os.walk(build_dir)
+        for path in (os.path.join(root, f) for f in files if not f.endswith(".log"))
+    }
 
 
 @pytest.mark.usefixtures("_needs_verilator")
-def test_no_rebuild_without_clean(pytester):
-    """Second run with same sim_build should not recompile."""
+def test_rebuild_only_with_clean(pytester):
+    """A rerun reuses the build; --clean forces a full rebuild.
+
+    Both checks share one project and its first build, so the design is only
+    compiled twice.
+    """
     _make_counter_project(pytester)
     sim_build = pytester.path / "sim_build"
     build_dir = sim_build / "build"
@@ -449,51 +510,20 @@ def test_no_rebuild_without_clean(pytester):
 
     # Check that no build artifacts were modified
     changed = {
-        path
-        for path in mtimes_after_first
-        if mtimes_after_first[path] != mtimes_after_second.get(path)
+        path for path, _ in mtimes_after_first.items() - mtimes_after_second.items()
     }
     assert not changed, f"Build artifacts were modified on second run: {changed}"
 
+    # Third run with --clean
+    r3 = pytester.runpytest(*common_args, "--clean")
+    r3.assert_outcomes(passed=1)
 
-@pytest.mark.usefixtures("_needs_verilator")
-def test_rebuild_with_clean(pytester):
-    """--clean should force a full rebuild."""
-    _make_counter_project(pytester)
-    sim_build = pytester.path / "sim_build"
-    build_dir = sim_build / "build"
-    common_args = [
-        "--simulator",
-        "verilator",
-        "--hdl-toplevel",
-        "counter",
-        "--sources",
-        str(pytester.path / "rtl" / "counter.sv"),
-        "--sim-build",
-        str(sim_build),
-        "--modules",
-        VERILATOR_MODULE,
-    ]
-
-    # First run
-    r1 = pytester.runpytest(*common_args)
-    r1.assert_outcomes(passed=1)
-
-    mtimes_after_first = _get_build_artifact_mtimes(build_dir)
-
-    # Second run with --clean
-    r2 = pytester.runpytest(*common_args, "--clean")
-    r2.assert_outcomes(passed=1)
-
-    mtimes_after_second = _get_build_artifact_mtimes(build_dir)
+    mtimes_after_third = _get_build_artifact_mtimes(build_dir)
 
     # At least some artifacts should have new timestamps
     changed = {
-        path
-        for path in mtimes_after_first
-        if path in mtimes_after_second
-        and mtimes_after_first[path] != mtimes_after_second[path]
-    }
+        path for path, _ in mtimes_after_second.items() - mtimes_after_third.items()
+    } & mtimes_after_third.keys()
     assert changed, "Expected build artifacts to be rebuilt with --clean"
 
 
@@ -557,3 +587,18 @@ def test_check_no_tmpdir(test_session):
 """)
     result = pytester.runpytest("--hdl-toplevel", "top", "--simulator", "verilator")
     result.assert_outcomes(passed=1)
+
+
+def test_parsed_test_args_not_shared_between_tests(pytester):
+    """Session-parsed --test-args are copied into each TestSession."""
+    pytester.makepyfile(conftest=_VARIANT_CONFTEST)
+    pytester.makepyfile("""\
+def test_first(test_session):
+    assert test_session.test_args == ["-a", "-b"]
+    test_session.test_args.append("-mutated")
+
+def test_second(test_session):
+    assert test_session.test_args == ["-a", "-b"]
+""")
+    result = pytester.runpytest("--hdl-toplevel", "top", "--test-args", "-a -b")
+    result.assert_outcomes(passed=2)